@@ -1,20 +1,52 @@
-from flask import Flask, jsonify, request, make_response
+from flask import Flask, jsonify, request, Response
 from flask_cors import CORS
+from flask_caching import Cache
+from flask_compress import Compress
 import os
-import pandas as pd
-import subprocess
+import logging
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from datetime import datetime, timezone, timedelta
+from github_metrics import COMMIT_FILES_FILE, COMMITS_FILE, activity_covers_range, calculate_metrics, load_user_metrics
+
+logging.basicConfig(level=logging.WARNING)
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:3000"])
-
-METRICS_DIR = "metrics_output"
-OVERALL_METRICS_FILE = os.path.join(METRICS_DIR, "overall_metrics.csv")
+cache = Cache(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 300})
+app.config["COMPRESS_MIMETYPES"] = ["application/json"]
+app.config["COMPRESS_ALGORITHM"] = "gzip"
+app.config["COMPRESS_LEVEL"] = 5
+Compress(app)
 
 @app.before_request
 def log_request_info():
-    print(f"Headers: {request.headers}")
-    print(f"Body: {request.get_data()}")
+    # Only log small bodies in debug mode so the body is never buffered otherwise
+    if app.debug and request.content_length and request.content_length < 4096:
+        app.logger.debug(f"Headers: {request.headers}")
+        app.logger.debug(f"Body: {request.get_data()}")
+
+def dump_json(obj):
+    """
+    Serialize an object to JSON bytes, using orjson when it is available.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NAIVE_UTC)
+    return json.dumps(obj, default=str).encode("utf-8")
+
+def metrics_cache_key(from_date, to_date):
+    """
+    Build the cache key for a date range, tied to the current activity files.
+
+    Returns None when the activity files do not exist yet.
+    """
+    if not (os.path.exists(COMMITS_FILE) and os.path.exists(COMMIT_FILES_FILE)):
+        return None
+    mtimes = ":".join(str(os.stat(path).st_mtime_ns) for path in (COMMITS_FILE, COMMIT_FILES_FILE))
+    return f"m:{from_date}:{to_date}:{mtimes}"
 
 @app.route("/metrics", methods=["GET"])
 def get_metrics():
@@ -32,29 +64,22 @@ def get_metrics():
         start_date = datetime.strptime(from_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
         end_date = datetime.strptime(to_date, '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1) - timedelta(seconds=1)
 
-        # Call the github_metrics.py script with the date range
-        print(f"Fetching metrics for date range: {start_date} to {end_date}")
-        subprocess.run(
-            ["python3", "github_metrics.py", "--from-date", from_date, "--to-date", to_date],
-            check=True,
-            text=True
-        )
-
-        # Ensure the metrics file exists after running the script
-        if not os.path.exists(OVERALL_METRICS_FILE):
-            return jsonify({"error": "Metrics file not found after script execution."}), 404
-
-        # Read the metrics file
-        df = pd.read_csv(OVERALL_METRICS_FILE)
-
-        # If the Date column exists, filter based on the date range
-        if 'Date' in df.columns:
-            df['Date'] = pd.to_datetime(df['Date'])
-            df = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)]
-
-        # Convert the data to JSON and return it
-        metrics = df.to_dict(orient="records")
-        return jsonify(metrics)
+        # Serve from cache if the activity file is unchanged since this range was last served
+        cached = cache.get(metrics_cache_key(from_date, to_date))
+        if cached is not None:
+            return Response(cached, mimetype="application/json")
+
+        # Only scrape GitHub when the stored activity does not cover the date range
+        if not activity_covers_range(start_date, end_date):
+            print(f"Fetching metrics for date range: {start_date} to {end_date}")
+            calculate_metrics(start_date, end_date)
+
+        # Aggregate the stored activity for the date range and return it as JSON
+        key = metrics_cache_key(from_date, to_date)
+        metrics = load_user_metrics(start_date, end_date).to_dict(orient="records")
+        payload = dump_json(metrics)
+        cache.set(key, payload)
+        return Response(payload, mimetype="application/json")
     except Exception as e:
         print(f"Exception occurred: {str(e)}")
         return jsonify({"error": f"Failed to fetch metrics: {str(e)}"}), 500
@@ -75,16 +100,14 @@ def refresh_metrics():
         start_date = datetime.strptime(from_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
         end_date = datetime.strptime(to_date, '%Y-%m-%d').replace(tzinfo=timezone.utc) + timedelta(days=1) - timedelta(seconds=1)
 
-        # Call the github_metrics.py script with the date range
+        # Calculate the metrics for the date range
         print(f"Refreshing metrics for date range: {start_date} to {end_date}")
-        result = subprocess.run(
-            ["python3", "github_metrics.py", "--from-date", from_date, "--to-date", to_date],
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
-            return jsonify({"error": f"Failed to refresh metrics: {result.stderr}"}), 500
+        try:
+            calculate_metrics(start_date, end_date)
+        except Exception as e:
+            return jsonify({"error": f"Failed to refresh metrics: {str(e)}"}), 500
+        finally:
+            cache.clear()
 
         return jsonify({"message": "Metrics refreshed successfully"}), 200
     except Exception as e:
@@ -1,18 +1,116 @@
-from github import Github
+from github import Auth, Github
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timezone, timedelta
 import os
+import logging
 from dotenv import load_dotenv
-from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 import argparse
 import shutil
+import shelve
+import threading
+import fcntl
+from contextlib import contextmanager
+import time
+from ratelimit import limits, sleep_and_retry
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 METRICS_DIR = "metrics_output"
 OVERALL_METRICS_FILE = os.path.join(METRICS_DIR, "overall_metrics.csv")
+COMMITS_FILE = os.path.join(METRICS_DIR, "commits.parquet")
+COMMIT_FILES_FILE = os.path.join(METRICS_DIR, "commit_files.parquet")
+
+COMMIT_CACHE_FILE = os.path.join(METRICS_DIR, ".commit_cache")
+
+API_URL = "https://api.github.com"
+GRAPHQL_URL = f"{API_URL}/graphql"
+
+# Concurrency for branch processing and the per-process request budget. The budget bursts freely;
+# X-RateLimit-Remaining is what keeps all worker processes together under GitHub's 5000/hr.
+MAX_WORKERS = 20
+REQUESTS_PER_HOUR = 5000
+
+# Attempts for a request rejected by a primary or secondary rate limit
+RATE_LIMIT_RETRIES = 5
+# Default wait for a secondary rate limit that sends no Retry-After header
+SECONDARY_RATE_LIMIT_WAIT = 60
+
+# Shared GitHub client so the underlying HTTP connection pool is reused across runs
+_TOKEN = os.getenv("GITHUB_TOKEN")
+_RETRY = Retry(total=5, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+_GH = Github(
+    auth=Auth.Token(_TOKEN) if _TOKEN else None,
+    per_page=100,
+    retry=_RETRY,
+    pool_size=50
+)
+
+# Pooled session for the GraphQL endpoint, which PyGithub does not cover
+_SESSION = requests.Session()
+# GraphQL queries are read-only POSTs, so they are safe to retry as well
+_SESSION.mount("https://", HTTPAdapter(pool_maxsize=50, max_retries=_RETRY.new(allowed_methods=None)))
+_SESSION.headers["Accept"] = "application/vnd.github+json"
+if _TOKEN:
+    _SESSION.headers["Authorization"] = f"bearer {_TOKEN}"
+
+# Serializes thread access to the open commit cache, which shelve does not make thread safe
+_COMMIT_CACHE_LOCK = threading.Lock()
+# Serializes metrics runs within a process; cooperative under gevent once threading is patched
+_RUN_LOCK = threading.Lock()
+# Seconds between attempts to take the cross-process file lock
+FILE_LOCK_POLL_INTERVAL = 0.5
+
+BRANCH_TIPS_QUERY = """
+query($owner: String!, $name: String!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    refs(refPrefix: "refs/heads/", first: 100, after: $cursor) {
+      nodes {
+        name
+        target {
+          ... on Commit {
+            author { date }
+          }
+        }
+      }
+      pageInfo { endCursor hasNextPage }
+    }
+  }
+}
+"""
+
+BRANCH_HISTORY_QUERY = """
+query($owner: String!, $name: String!, $branch: String!, $since: GitTimestamp!, $until: GitTimestamp!, $cursor: String) {
+  repository(owner: $owner, name: $name) {
+    ref(qualifiedName: $branch) {
+      target {
+        ... on Commit {
+          history(since: $since, until: $until, first: 100, after: $cursor) {
+            nodes {
+              oid
+              additions
+              deletions
+              committedDate
+              author { user { login } date }
+            }
+            pageInfo { endCursor hasNextPage }
+          }
+        }
+      }
+    }
+  }
+}
+"""
 
 def clean_output_directory(output_dir):
     """
@@ -25,6 +123,158 @@ def clean_output_directory(output_dir):
         shutil.rmtree(output_dir)  # Remove the directory and all its contents
     os.makedirs(output_dir, exist_ok=True)  # Recreate the directory
 
+@sleep_and_retry
+@limits(calls=REQUESTS_PER_HOUR, period=3600)
+def throttle():
+    """
+    Block until the shared request budget allows another GitHub API call.
+    """
+
+def get_rate_limit_wait(response):
+    """
+    Work out how long to wait before retrying a rate limited response.
+
+    Args:
+        response: Response from the GitHub API.
+
+    Returns:
+        Seconds to wait, or None if the response was not rate limited.
+    """
+    if response.status_code not in (403, 429):
+        return None
+    if "Retry-After" in response.headers:
+        return int(response.headers["Retry-After"])
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset_at = int(response.headers.get("X-RateLimit-Reset", time.time()))
+        return max(0, reset_at - time.time())
+    if response.status_code == 429 or "rate limit" in response.text.lower():
+        return SECONDARY_RATE_LIMIT_WAIT
+    return None
+
+def send_request(method, url, **kwargs):
+    """
+    Send a rate limited request to the GitHub API.
+
+    Requests rejected by a primary or secondary rate limit are retried after the
+    wait GitHub asks for. Once the primary limit is exhausted, the next request
+    waits for the window to reset.
+
+    Args:
+        method: HTTP method.
+        url: Absolute API URL.
+        **kwargs: Extra arguments passed to requests.
+
+    Returns:
+        The response object.
+    """
+    for attempt in range(RATE_LIMIT_RETRIES):
+        throttle()
+        response = _SESSION.request(method, url, **kwargs)
+        wait = get_rate_limit_wait(response)
+        if wait is None or attempt == RATE_LIMIT_RETRIES - 1:
+            break
+        print(f"Rate limited by GitHub, retrying in {wait:.0f}s")
+        time.sleep(wait)
+
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        reset_at = int(response.headers.get("X-RateLimit-Reset", time.time()))
+        wait = max(0, reset_at - time.time())
+        print(f"Rate limit exhausted, waiting {wait:.0f}s for reset")
+        time.sleep(wait)
+    return response
+
+@contextmanager
+def open_commit_cache():
+    """
+    Open the on-disk commit cache for the duration of a metrics run.
+
+    Runs in the same process wait on a lock first; runs in other processes wait on
+    an exclusive file lock. The file lock is polled without blocking, so gevent
+    workers keep scheduling other greenlets while they wait.
+
+    Yields:
+        A shelve mapping "owner/repo:sha" keys to lists of changed file names.
+    """
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with _RUN_LOCK, open(f"{COMMIT_CACHE_FILE}.lock", "w") as lock_file:
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(FILE_LOCK_POLL_INTERVAL)
+        try:
+            with shelve.open(COMMIT_CACHE_FILE) as commit_cache:
+                yield commit_cache
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def get_commit_files(repo, sha, commit_cache):
+    """
+    Get the names of the files changed by a commit.
+
+    Commits are immutable, so a cached entry is returned without any API call.
+
+    Args:
+        repo: GitHub repository object.
+        sha: Commit SHA.
+        commit_cache: Cache as yielded by open_commit_cache.
+
+    Returns:
+        List of changed file names.
+    """
+    key = f"{repo.full_name}:{sha}"
+    with _COMMIT_CACHE_LOCK:
+        filenames = commit_cache.get(key)
+    if filenames is not None:
+        return filenames
+
+    response = send_request("GET", f"{API_URL}/repos/{repo.full_name}/commits/{sha}")
+    response.raise_for_status()
+    filenames = [file["filename"] for file in response.json().get("files", [])]
+    with _COMMIT_CACHE_LOCK:
+        commit_cache[key] = filenames
+    return filenames
+
+def run_graphql_query(query, variables):
+    """
+    Run a query against the GitHub GraphQL API.
+
+    Args:
+        query: GraphQL query string.
+        variables: Dictionary of query variables.
+
+    Returns:
+        The "data" member of the response.
+    """
+    response = send_request("POST", GRAPHQL_URL, json={"query": query, "variables": variables})
+    response.raise_for_status()
+    result = response.json()
+    if result.get("errors"):
+        raise RuntimeError(f"GraphQL query failed: {result['errors']}")
+    return result["data"]
+
+def get_branch_tips(repo):
+    """
+    Fetch every branch with the author date of its tip commit via GraphQL.
+
+    Args:
+        repo: GitHub repository object.
+
+    Yields:
+        Tuples of (branch name, tip commit date), 100 branches per request.
+    """
+    owner, name = repo.full_name.split("/")
+    variables = {"owner": owner, "name": name, "cursor": None}
+    while True:
+        refs = run_graphql_query(BRANCH_TIPS_QUERY, variables)["repository"]["refs"]
+        for node in refs["nodes"]:
+            author = node["target"].get("author")
+            yield node["name"], datetime.fromisoformat(author["date"]) if author else None
+        if not refs["pageInfo"]["hasNextPage"]:
+            return
+        variables["cursor"] = refs["pageInfo"]["endCursor"]
+
 def get_recent_branches(repo, start_date, end_date):
     """
     Fetch branches updated within the specified date range.
@@ -35,157 +285,343 @@ def get_recent_branches(repo, start_date, end_date):
         end_date: End date for filtering activity.
 
     Returns:
-        List of branch objects updated within the specified time frame.
+        List of branch dictionaries, keyed by "name", updated within the specified time frame.
     """
     recent_branches = []
 
-    for branch in repo.get_branches():
-        try:
-            # Get the last commit date for the branch
-            last_commit = branch.commit.commit.author.date
-            if start_date <= last_commit <= end_date:
-                recent_branches.append(branch)
-        except Exception as e:
-            print(f"Warning: Could not process branch {branch.name}: {str(e)}")
+    for branch_name, last_commit in get_branch_tips(repo):
+        if last_commit is None:
+            print(f"Warning: Could not process branch {branch_name}: tip is not a commit")
             continue
+        if start_date <= last_commit <= end_date:
+            recent_branches.append({"name": branch_name})
 
     print(f"Found {len(recent_branches)} branches updated between {start_date} and {end_date}")
     return recent_branches
 
-def process_branch(branch, repo, start_date, end_date, processed_commits):
+def get_branch_history(repo, branch_name, start_date, end_date):
     """
-    Process a single branch to extract user activity.
+    Fetch the commit history of a branch in pages of 100 commits via GraphQL.
 
     Args:
-        branch: Branch object to process.
+        repo: GitHub repository object.
+        branch_name: Name of the branch.
+        start_date: Start date for filtering activity.
+        end_date: End date for filtering activity.
+
+    Yields:
+        Commit nodes with oid, additions, deletions, committedDate and author details.
+    """
+    owner, name = repo.full_name.split("/")
+    variables = {
+        "owner": owner,
+        "name": name,
+        "branch": f"refs/heads/{branch_name}",
+        "since": start_date.isoformat(),
+        "until": end_date.isoformat(),
+        "cursor": None
+    }
+    while True:
+        ref = run_graphql_query(BRANCH_HISTORY_QUERY, variables)["repository"]["ref"]
+        if ref is None:
+            return
+        history = ref["target"]["history"]
+        yield from history["nodes"]
+        if not history["pageInfo"]["hasNextPage"]:
+            return
+        variables["cursor"] = history["pageInfo"]["endCursor"]
+
+def fetch_branch_commits(branch, repo, start_date, end_date):
+    """
+    Fetch the commit history of a single branch.
+
+    Args:
+        branch: Branch to fetch, as returned by get_recent_branches.
         repo: GitHub repository object.
         start_date: Start date for filtering activity.
         end_date: End date for filtering activity.
-        processed_commits: Set to track already processed commit SHAs.
 
     Returns:
-        A dictionary containing user activity for all users in the branch.
-    """
-    branch_activity = defaultdict(lambda: {
-        "commits": 0,
-        "files_changed": set(),
-        "lines_added": 0,
-        "lines_removed": 0,
-        "coding_days": set(),
-        "commits_per_day": defaultdict(int)
-    })
-
-    try:
-        branch_commits = repo.get_commits(sha=branch.commit.sha, since=start_date, until=end_date)
-        for commit in branch_commits:
-            commit_sha = commit.sha
-            commit_author = commit.author.login if commit.author else "Unknown"
-            commit_date = commit.commit.author.date.date()
-
-            # Skip duplicate commits
-            if commit_sha in processed_commits:
-                continue
-
-            # Log commit details for debugging
-            print(f"Processing commit: {commit_sha}, Author: {commit_author}, Date: {commit_date}")
-
-            # Mark commit as processed
-            processed_commits.add(commit_sha)
-
-            # Update branch activity for the author
-            branch_activity[commit_author]["commits"] += 1
-            branch_activity[commit_author]["coding_days"].add(commit_date)
-            branch_activity[commit_author]["commits_per_day"][commit_date] += 1
+        List of commit nodes, empty if the branch no longer exists.
+    """
+    # Failures propagate, like file lookups in process_branch, so a branch is never silently dropped
+    return list(get_branch_history(repo, branch["name"], start_date, end_date))
 
-            try:
-                files = commit.files
-                for file in files:
-                    branch_activity[commit_author]["files_changed"].add(file.filename)
-                    if file.additions is not None:
-                        branch_activity[commit_author]["lines_added"] += file.additions
-                    if file.deletions is not None:
-                        branch_activity[commit_author]["lines_removed"] += file.deletions
-            except Exception as e:
-                print(f"Warning: Could not process files in commit {commit_sha}: {str(e)}")
-                continue
-    except Exception as e:
-        print(f"Warning: Could not process branch {branch.name}: {str(e)}")
+def assign_commits_to_branches(branches, branch_histories, default_branch):
+    """
+    Assign every commit to exactly one branch, preferring the default branch.
 
-    return branch_activity
+    Args:
+        branches: List of branches.
+        branch_histories: Commit nodes for each branch, in the same order.
+        default_branch: Name of the repository's default branch.
 
-def get_all_user_metrics(repo, start_date, end_date):
+    Returns:
+        List of (branch, commits) pairs with no commit SHA repeated across pairs.
     """
-    Get metrics for all users on their individual branches.
+    pairs = sorted(zip(branches, branch_histories), key=lambda pair: pair[0]["name"] != default_branch)
+    assigned_commits = set()
+    assignments = []
+    for branch, commits in pairs:
+        branch_commits = [commit for commit in commits if commit["oid"] not in assigned_commits]
+        assigned_commits.update(commit["oid"] for commit in branch_commits)
+        assignments.append((branch, branch_commits))
+    return assignments
+
+# "date" is the author date, used for coding days; "committed_date" is the committer date,
+# which GraphQL history(since, until) filters on and so selects rows for a date range
+COMMIT_COLUMNS = ["sha", "author", "date", "committed_date", "additions", "deletions", "branch"]
+FILE_COLUMNS = ["sha", "author", "date", "committed_date", "filename", "branch"]
+
+# Report column names for each aggregated metric
+REPORT_COLUMNS = {
+    "author": "User",
+    "coding_days": "Total Coding Days",
+    "commits": "Total Commits",
+    "files_changed": "Files Changed",
+    "lines_added": "Lines Added",
+    "lines_removed": "Lines Removed"
+}
+
+def process_branch(branch, repo, commits, commit_cache):
+    """
+    Process the commits assigned to a single branch into columnar activity data.
+
+    Args:
+        branch: Branch to process, as returned by get_recent_branches.
+        repo: GitHub repository object.
+        commits: Commit nodes assigned to this branch.
+        commit_cache: Cache as yielded by open_commit_cache.
+
+    Returns:
+        A tuple of (commit_columns, file_columns): dictionaries mapping each
+        name in COMMIT_COLUMNS and FILE_COLUMNS to a list of values.
+    """
+    commit_columns = {column: [] for column in COMMIT_COLUMNS}
+    file_columns = {column: [] for column in FILE_COLUMNS}
+
+    for commit in commits:
+        commit_sha = commit["oid"]
+        author = commit["author"]
+        commit_author = author["user"]["login"] if author and author["user"] else "Unknown"
+        commit_date = datetime.fromisoformat(author["date"]).astimezone(timezone.utc).date()
+        committed_date = datetime.fromisoformat(commit["committedDate"]).astimezone(timezone.utc).date()
+
+        # Log commit details for debugging
+        logger.debug("Processing commit: %s, Branch: %s, Author: %s, Date: %s", commit_sha, branch["name"], commit_author, commit_date)
+
+        commit_columns["sha"].append(commit_sha)
+        commit_columns["author"].append(commit_author)
+        commit_columns["date"].append(commit_date)
+        commit_columns["committed_date"].append(committed_date)
+        commit_columns["additions"].append(commit["additions"])
+        commit_columns["deletions"].append(commit["deletions"])
+        commit_columns["branch"].append(branch["name"])
+
+        # File names are not exposed by GraphQL, so they still come from REST.
+        # Failures propagate so Files Changed is never silently undercounted.
+        for filename in get_commit_files(repo, commit_sha, commit_cache):
+            file_columns["sha"].append(commit_sha)
+            file_columns["author"].append(commit_author)
+            file_columns["date"].append(commit_date)
+            file_columns["committed_date"].append(committed_date)
+            file_columns["filename"].append(filename)
+            file_columns["branch"].append(branch["name"])
+
+    return commit_columns, file_columns
+
+def concat_columns(column_sets, columns):
+    """
+    Concatenate per-branch column lists into a single list per column.
+
+    Args:
+        column_sets: List of dictionaries as returned by process_branch.
+        columns: Column names to concatenate.
+
+    Returns:
+        A dictionary mapping each column name to the combined list of values.
+    """
+    return {
+        column: list(chain.from_iterable(column_set[column] for column_set in column_sets))
+        for column in columns
+    }
+
+def aggregate_user_metrics(commit_columns, file_columns):
+    """
+    Aggregate columnar activity data into per-user metrics.
+
+    Args:
+        commit_columns: Columns named in COMMIT_COLUMNS, as a dictionary of lists or a DataFrame.
+        file_columns: Columns named in FILE_COLUMNS, as a dictionary of lists or a DataFrame.
+
+    Returns:
+        A DataFrame indexed by author with commits, files_changed, lines_added,
+        lines_removed and coding_days columns.
+    """
+    commits_df = pd.DataFrame(commit_columns, columns=COMMIT_COLUMNS)
+    files_df = pd.DataFrame(file_columns, columns=FILE_COLUMNS)
+
+    user_metrics = commits_df.groupby("author").agg(
+        commits=("sha", "nunique"),
+        lines_added=("additions", "sum"),
+        lines_removed=("deletions", "sum"),
+        coding_days=("date", "nunique")
+    )
+    files_changed = files_df.groupby("author")["filename"].nunique()
+    user_metrics["files_changed"] = files_changed.reindex(user_metrics.index, fill_value=0)
+
+    return user_metrics
+
+def collect_activity(repo, start_date, end_date, commit_cache):
+    """
+    Collect raw commit and file activity for all branches updated in the date range.
 
     Args:
         repo: GitHub repository object.
         start_date: Start date for filtering activity.
         end_date: End date for filtering activity.
+        commit_cache: Cache as yielded by open_commit_cache.
 
     Returns:
-        A dictionary containing metrics for all users.
+        A tuple of (commit_columns, file_columns) covering all branches.
     """
-
-    print("Inside get_all_user_metrics")
     branches = get_recent_branches(repo, start_date, end_date)
-    all_user_metrics = defaultdict(lambda: {
-        "commits": 0,
-        "files_changed": set(),
-        "lines_added": 0,
-        "lines_removed": 0,
-        "coding_days": set(),
-        "commits_per_day": defaultdict(int)
-    })
-    processed_commits = set()  # Track processed commits globally
-
-    with ThreadPoolExecutor() as executor:
-        futures = [executor.submit(process_branch, branch, repo, start_date, end_date, processed_commits) for branch in branches]
-        for future in futures:
-            branch_activity = future.result()
-            for user, metrics in branch_activity.items():
-                all_user_metrics[user]["commits"] += metrics["commits"]
-                all_user_metrics[user]["files_changed"].update(metrics["files_changed"])
-                all_user_metrics[user]["lines_added"] += metrics["lines_added"]
-                all_user_metrics[user]["lines_removed"] += metrics["lines_removed"]
-                all_user_metrics[user]["coding_days"].update(metrics["coding_days"])
-                for date, count in metrics["commits_per_day"].items():
-                    all_user_metrics[user]["commits_per_day"][date] += count
-
-    return all_user_metrics
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Fetch every branch history first so each commit is processed by exactly one worker
+        branch_histories = list(executor.map(
+            lambda branch: fetch_branch_commits(branch, repo, start_date, end_date), branches
+        ))
+        assignments = assign_commits_to_branches(branches, branch_histories, repo.default_branch)
+
+        futures = [executor.submit(process_branch, branch, repo, commits, commit_cache) for branch, commits in assignments]
+        results = [future.result() for future in futures]
+
+    commit_columns = concat_columns([commits for commits, _ in results], COMMIT_COLUMNS)
+    file_columns = concat_columns([files for _, files in results], FILE_COLUMNS)
+    return commit_columns, file_columns
+
+def format_report(user_metrics):
+    """
+    Format aggregated user metrics into the report columns.
+
+    Args:
+        user_metrics: DataFrame as returned by aggregate_user_metrics.
+
+    Returns:
+        A DataFrame with one row per user and the columns in REPORT_COLUMNS.
+    """
+    return user_metrics.reset_index().rename(columns=REPORT_COLUMNS)[list(REPORT_COLUMNS.values())]
+
+def save_activity(commit_columns, file_columns, from_date, to_date):
+    """
+    Persist raw commit and file activity to Parquet, recording the scraped date range
+    and the time of the scrape.
+
+    Args:
+        commit_columns: Dictionary mapping each name in COMMIT_COLUMNS to a list of values.
+        file_columns: Dictionary mapping each name in FILE_COLUMNS to a list of values.
+        from_date: Start of the scraped date range.
+        to_date: End of the scraped date range.
+    """
+    metadata = {
+        "from_date": from_date.isoformat(),
+        "to_date": to_date.isoformat(),
+        "scraped_at": datetime.now(timezone.utc).isoformat()
+    }
+    schemas = {
+        COMMITS_FILE: pa.schema([
+            ("sha", pa.string()), ("author", pa.string()), ("date", pa.date32()),
+            ("committed_date", pa.date32()), ("additions", pa.int64()), ("deletions", pa.int64()), ("branch", pa.string())
+        ]),
+        COMMIT_FILES_FILE: pa.schema([
+            ("sha", pa.string()), ("author", pa.string()), ("date", pa.date32()),
+            ("committed_date", pa.date32()), ("filename", pa.string()), ("branch", pa.string())
+        ])
+    }
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+    # Write both tables to temporary files first, then swap them in, so readers never see a partial file
+    temp_paths = {}
+    for path, columns in ((COMMITS_FILE, commit_columns), (COMMIT_FILES_FILE, file_columns)):
+        schema = schemas[path].with_metadata(metadata)
+        temp_paths[path] = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(pa.Table.from_pydict(columns, schema=schema), temp_paths[path], compression="zstd")
+    for path, temp_path in temp_paths.items():
+        os.replace(temp_path, path)
+
+def activity_covers_range(from_date, to_date):
+    """
+    Check whether the persisted activity was scraped for a range containing the given one.
+
+    The stored range only counts up to the time of the scrape, since commits pushed
+    afterwards are not in the files.
+
+    Args:
+        from_date: Start of the requested date range.
+        to_date: End of the requested date range.
+
+    Returns:
+        True if the stored Parquet files can answer the range without a new scrape.
+    """
+    if not (os.path.exists(COMMITS_FILE) and os.path.exists(COMMIT_FILES_FILE)):
+        return False
+    schema = pq.read_schema(COMMITS_FILE)
+    metadata = schema.metadata or {}
+    # Files written before committed_date was stored cannot be filtered correctly
+    if "committed_date" not in schema.names or not {b"from_date", b"to_date", b"scraped_at"} <= metadata.keys():
+        return False
+    stored_from = datetime.fromisoformat(metadata[b"from_date"].decode())
+    stored_to = datetime.fromisoformat(metadata[b"to_date"].decode())
+    scraped_at = datetime.fromisoformat(metadata[b"scraped_at"].decode())
+    return stored_from <= from_date and to_date <= min(stored_to, scraped_at)
+
+def load_user_metrics(from_date, to_date):
+    """
+    Aggregate the persisted activity for a date range.
+
+    Rows are selected on committer date, matching the window GitHub applied during the
+    scrape; only the row groups matching the range are read from the Parquet files.
+
+    Args:
+        from_date: Start date for filtering activity.
+        to_date: End date for filtering activity.
+
+    Returns:
+        A report DataFrame as returned by format_report.
+    """
+    filters = [("committed_date", ">=", from_date.date()), ("committed_date", "<=", to_date.date())]
+    commits_df = pd.read_parquet(COMMITS_FILE, filters=filters)
+    files_df = pd.read_parquet(COMMIT_FILES_FILE, filters=filters)
+    user_metrics = aggregate_user_metrics(commits_df, files_df)
+    return format_report(user_metrics)
 
 def calculate_metrics(from_date, to_date):
     """
-    Calculate metrics based on the date range and save to a CSV file.
+    Calculate metrics based on the date range and save them to Parquet and CSV files.
     """
-    token = os.getenv("GITHUB_TOKEN")
     repo_name = os.getenv("GITHUB_REPO", "owner/repo")
+    repo = _GH.get_repo(repo_name)
+
+    # Collect raw activity for all users and keep it for later date-range queries
+    # Saving under the cache lock keeps concurrent runs from interleaving the two file swaps
+    with open_commit_cache() as commit_cache:
+        commit_columns, file_columns = collect_activity(repo, from_date, to_date, commit_cache)
+        save_activity(commit_columns, file_columns, from_date, to_date)
+    print(f"Raw activity saved to {COMMITS_FILE} and {COMMIT_FILES_FILE}")
 
-    # Initialize GitHub client
-    g = Github(token)
-    repo = g.get_repo(repo_name)
-
-    # Get metrics for all users
-    all_user_metrics = get_all_user_metrics(repo, from_date, to_date)
-
-    # Format the metrics into a DataFrame
-    metrics = []
-    for user, data in all_user_metrics.items():
-        metrics.append({
-            "User": user,
-            "Total Coding Days": len(data["coding_days"]),
-            "Total Commits": data["commits"],
-            "Files Changed": len(data["files_changed"]),
-            "Lines Added": data["lines_added"],
-            "Lines Removed": data["lines_removed"]
-        })
+    # Format the metrics into the report columns
+    user_metrics = aggregate_user_metrics(commit_columns, file_columns)
+    df = format_report(user_metrics)
 
     # Save metrics to a CSV file
     os.makedirs(METRICS_DIR, exist_ok=True)
-    df = pd.DataFrame(metrics)
-    df.to_csv(OVERALL_METRICS_FILE, index=False)
+    pa_csv.write_csv(pa.Table.from_pandas(df, preserve_index=False), OVERALL_METRICS_FILE)
     print(f"Metrics saved to {OVERALL_METRICS_FILE}")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+
     parser = argparse.ArgumentParser(description="Calculate GitHub metrics.")
     parser.add_argument("--from-date", required=True, help="Start date (YYYY-MM-DD)")
     parser.add_argument("--to-date", required=True, help="End date (YYYY-MM-DD)")
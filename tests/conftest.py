@@ -0,0 +1,14 @@
+import pytest
+
+import github_metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    """Point every metrics output path at a temporary directory."""
+    monkeypatch.setattr(github_metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(github_metrics, "OVERALL_METRICS_FILE", str(tmp_path / "overall_metrics.csv"))
+    monkeypatch.setattr(github_metrics, "COMMITS_FILE", str(tmp_path / "commits.parquet"))
+    monkeypatch.setattr(github_metrics, "COMMIT_FILES_FILE", str(tmp_path / "commit_files.parquet"))
+    monkeypatch.setattr(github_metrics, "COMMIT_CACHE_FILE", str(tmp_path / ".commit_cache"))
+    return tmp_path
@@ -0,0 +1,127 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+import backend
+import github_metrics
+
+
+def save_sample_activity(from_date, to_date):
+    commit_columns = {
+        "sha": ["a", "b"],
+        "author": ["alice", "bob"],
+        "date": [date(2024, 1, 2), date(2024, 1, 20)],
+        "committed_date": [date(2024, 1, 2), date(2024, 1, 20)],
+        "additions": [3, 4],
+        "deletions": [1, 0],
+        "branch": ["main", "main"],
+    }
+    file_columns = {
+        "sha": ["a"],
+        "author": ["alice"],
+        "date": [date(2024, 1, 2)],
+        "committed_date": [date(2024, 1, 2)],
+        "filename": ["x.py"],
+        "branch": ["main"],
+    }
+    github_metrics.save_activity(commit_columns, file_columns, from_date, to_date)
+
+
+@pytest.fixture
+def scrapes(metrics_dir, monkeypatch):
+    monkeypatch.setattr(backend, "COMMITS_FILE", github_metrics.COMMITS_FILE)
+    monkeypatch.setattr(backend, "COMMIT_FILES_FILE", github_metrics.COMMIT_FILES_FILE)
+    backend.cache.clear()
+
+    calls = []
+
+    def fake_calculate_metrics(from_date, to_date):
+        calls.append((from_date.date(), to_date.date()))
+        save_sample_activity(from_date, to_date)
+
+    monkeypatch.setattr(backend, "calculate_metrics", fake_calculate_metrics)
+    yield calls
+    backend.cache.clear()
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+def test_metrics_requires_both_dates(client, scrapes):
+    response = client.get("/metrics?from=2024-01-01")
+
+    assert response.status_code == 400
+    assert scrapes == []
+
+
+def test_metrics_scrapes_uncovered_range(client, scrapes):
+    response = client.get("/metrics?from=2024-01-01&to=2024-01-31")
+
+    assert response.status_code == 200
+    assert scrapes == [(date(2024, 1, 1), date(2024, 1, 31))]
+    rows = {row["User"]: row for row in response.get_json()}
+    assert rows["alice"]["Files Changed"] == 1
+    assert rows["bob"]["Lines Added"] == 4
+
+
+def test_metrics_serves_covered_range_without_scraping(client, scrapes):
+    client.get("/metrics?from=2024-01-01&to=2024-01-31")
+
+    response = client.get("/metrics?from=2024-01-10&to=2024-01-31")
+
+    assert response.status_code == 200
+    assert len(scrapes) == 1
+    assert [row["User"] for row in response.get_json()] == ["bob"]
+
+
+def test_metrics_scrapes_again_outside_stored_range(client, scrapes):
+    client.get("/metrics?from=2024-01-01&to=2024-01-31")
+
+    client.get("/metrics?from=2024-01-01&to=2024-02-15")
+
+    assert scrapes == [(date(2024, 1, 1), date(2024, 1, 31)), (date(2024, 1, 1), date(2024, 2, 15))]
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+    real_load_user_metrics = backend.load_user_metrics
+
+    def counting_load_user_metrics(from_date, to_date):
+        calls.append((from_date.date(), to_date.date()))
+        return real_load_user_metrics(from_date, to_date)
+
+    monkeypatch.setattr(backend, "load_user_metrics", counting_load_user_metrics)
+    return calls
+
+
+def test_metrics_cache_hit_skips_loading(client, scrapes, loads):
+    first = client.get("/metrics?from=2024-01-01&to=2024-01-31")
+    second = client.get("/metrics?from=2024-01-01&to=2024-01-31")
+
+    assert second.status_code == 200
+    assert second.get_json() == first.get_json()
+    assert len(scrapes) == 1
+    assert len(loads) == 1
+
+
+def test_metrics_cache_is_keyed_on_date_range(client, scrapes, loads):
+    client.get("/metrics?from=2024-01-01&to=2024-01-31")
+    client.get("/metrics?from=2024-01-10&to=2024-01-31")
+
+    assert len(loads) == 2
+
+
+def test_metrics_cache_misses_after_activity_is_rewritten(client, scrapes, loads):
+    client.get("/metrics?from=2024-01-01&to=2024-01-31")
+    key = backend.metrics_cache_key("2024-01-01", "2024-01-31")
+
+    # Rewrite the stored activity; its new mtimes must produce a new key
+    save_sample_activity(datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 2, 1, tzinfo=timezone.utc))
+
+    assert backend.metrics_cache_key("2024-01-01", "2024-01-31") != key
+    client.get("/metrics?from=2024-01-01&to=2024-01-31")
+    assert len(loads) == 2
+    assert len(scrapes) == 1
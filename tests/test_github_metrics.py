@@ -0,0 +1,235 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+import github_metrics
+
+
+def make_commit(oid, login="alice", day=1, additions=1, deletions=0):
+    return {
+        "oid": oid,
+        "additions": additions,
+        "deletions": deletions,
+        "author": {"user": {"login": login}, "date": f"2024-01-{day:02d}T12:00:00Z"},
+    }
+
+
+def test_assign_commits_prefers_default_branch():
+    branches = [{"name": "feature"}, {"name": "main"}, {"name": "other"}]
+    histories = [
+        [make_commit("a"), make_commit("b"), make_commit("f")],
+        [make_commit("a"), make_commit("b")],
+        [make_commit("f"), make_commit("o")],
+    ]
+
+    assignments = github_metrics.assign_commits_to_branches(branches, histories, "main")
+
+    assigned = {branch["name"]: [commit["oid"] for commit in commits] for branch, commits in assignments}
+    assert assignments[0][0]["name"] == "main"
+    assert assigned == {"main": ["a", "b"], "feature": ["f"], "other": ["o"]}
+
+
+def test_assign_commits_never_repeats_a_sha():
+    branches = [{"name": "x"}, {"name": "y"}]
+    histories = [[make_commit("a"), make_commit("b")], [make_commit("b"), make_commit("a")]]
+
+    assignments = github_metrics.assign_commits_to_branches(branches, histories, "main")
+
+    oids = [commit["oid"] for _, commits in assignments for commit in commits]
+    assert sorted(oids) == ["a", "b"]
+
+
+def test_aggregate_user_metrics_counts_unique_values():
+    commit_columns = {
+        "sha": ["a", "b", "c"],
+        "author": ["alice", "alice", "bob"],
+        "date": [date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 2)],
+        "committed_date": [date(2024, 1, 1), date(2024, 1, 1), date(2024, 1, 2)],
+        "additions": [3, 2, 1],
+        "deletions": [1, 2, 0],
+        "branch": ["main", "main", "feature"],
+    }
+    file_columns = {
+        "sha": ["a", "b", "b"],
+        "author": ["alice", "alice", "alice"],
+        "date": [date(2024, 1, 1)] * 3,
+        "committed_date": [date(2024, 1, 1)] * 3,
+        "filename": ["x.py", "x.py", "y.py"],
+        "branch": ["main"] * 3,
+    }
+
+    user_metrics = github_metrics.aggregate_user_metrics(commit_columns, file_columns)
+
+    alice = user_metrics.loc["alice"]
+    assert (alice["commits"], alice["lines_added"], alice["lines_removed"]) == (2, 5, 3)
+    assert (alice["coding_days"], alice["files_changed"]) == (1, 2)
+
+
+def test_aggregate_user_metrics_fills_missing_files_with_zero():
+    commit_columns = {
+        "sha": ["a"],
+        "author": ["bob"],
+        "date": [date(2024, 1, 1)],
+        "committed_date": [date(2024, 1, 1)],
+        "additions": [1],
+        "deletions": [0],
+        "branch": ["main"],
+    }
+    file_columns = {column: [] for column in github_metrics.FILE_COLUMNS}
+
+    user_metrics = github_metrics.aggregate_user_metrics(commit_columns, file_columns)
+
+    assert user_metrics.loc["bob", "files_changed"] == 0
+
+
+@pytest.fixture
+def stored_activity(metrics_dir):
+    from_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    to_date = datetime(2024, 1, 31, 23, 59, 59, tzinfo=timezone.utc)
+    commit_columns = {column: [] for column in github_metrics.COMMIT_COLUMNS}
+    file_columns = {column: [] for column in github_metrics.FILE_COLUMNS}
+    github_metrics.save_activity(commit_columns, file_columns, from_date, to_date)
+    return from_date, to_date
+
+
+def test_activity_covers_range_without_files(metrics_dir):
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert not github_metrics.activity_covers_range(day, day)
+
+
+def test_activity_covers_contained_ranges(stored_activity):
+    from_date, to_date = stored_activity
+
+    assert github_metrics.activity_covers_range(from_date, to_date)
+    assert github_metrics.activity_covers_range(from_date + timedelta(days=5), to_date - timedelta(days=5))
+
+
+def test_activity_does_not_cover_ranges_outside_the_scrape(stored_activity):
+    from_date, to_date = stored_activity
+
+    assert not github_metrics.activity_covers_range(from_date - timedelta(days=1), to_date)
+    assert not github_metrics.activity_covers_range(from_date, to_date + timedelta(days=1))
+
+
+def test_activity_does_not_cover_time_after_the_scrape(metrics_dir):
+    from_date = datetime.now(timezone.utc) - timedelta(days=7)
+    to_date = datetime.now(timezone.utc) + timedelta(days=1)
+    commit_columns = {column: [] for column in github_metrics.COMMIT_COLUMNS}
+    file_columns = {column: [] for column in github_metrics.FILE_COLUMNS}
+    github_metrics.save_activity(commit_columns, file_columns, from_date, to_date)
+
+    assert github_metrics.activity_covers_range(from_date, from_date + timedelta(days=1))
+    assert not github_metrics.activity_covers_range(from_date, to_date)
+
+
+def test_load_user_metrics_filters_on_committer_date(metrics_dir):
+    # "rebased" was authored before the range but committed inside it; "late" was committed after it
+    commit_columns = {
+        "sha": ["early", "rebased", "inside", "late"],
+        "author": ["alice", "bob", "alice", "carol"],
+        "date": [date(2023, 12, 31), date(2023, 12, 30), date(2024, 1, 31), date(2024, 1, 20)],
+        "committed_date": [date(2023, 12, 31), date(2024, 1, 1), date(2024, 1, 31), date(2024, 2, 1)],
+        "additions": [1, 5, 2, 7],
+        "deletions": [0, 0, 1, 0],
+        "branch": ["main"] * 4,
+    }
+    file_columns = {
+        "sha": ["early", "rebased", "inside"],
+        "author": ["alice", "bob", "alice"],
+        "date": [date(2023, 12, 31), date(2023, 12, 30), date(2024, 1, 31)],
+        "committed_date": [date(2023, 12, 31), date(2024, 1, 1), date(2024, 1, 31)],
+        "filename": ["a.py", "b.py", "c.py"],
+        "branch": ["main"] * 3,
+    }
+    from_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    to_date = datetime(2024, 1, 31, 23, 59, 59, tzinfo=timezone.utc)
+    github_metrics.save_activity(commit_columns, file_columns, from_date - timedelta(days=5), to_date + timedelta(days=5))
+
+    report = github_metrics.load_user_metrics(from_date, to_date).set_index("User")
+
+    assert sorted(report.index) == ["alice", "bob"]
+    assert report.loc["alice", "Total Commits"] == 1
+    assert report.loc["alice", "Lines Added"] == 2
+    assert report.loc["bob", "Files Changed"] == 1
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    waits = []
+    monkeypatch.setattr(github_metrics, "throttle", lambda: None)
+    monkeypatch.setattr(github_metrics.time, "sleep", waits.append)
+    return waits
+
+
+def test_rate_limit_wait_ignores_ordinary_responses():
+    assert github_metrics.get_rate_limit_wait(FakeResponse(200)) is None
+    assert github_metrics.get_rate_limit_wait(FakeResponse(403, text="Bad credentials")) is None
+
+
+def test_rate_limit_wait_honors_retry_after():
+    assert github_metrics.get_rate_limit_wait(FakeResponse(403, {"Retry-After": "7"})) == 7
+    assert github_metrics.get_rate_limit_wait(FakeResponse(429, {"Retry-After": "3"})) == 3
+
+
+def test_rate_limit_wait_until_primary_reset(monkeypatch):
+    monkeypatch.setattr(github_metrics.time, "time", lambda: 1000)
+    response = FakeResponse(403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1030"})
+
+    assert github_metrics.get_rate_limit_wait(response) == 30
+
+
+def test_rate_limit_wait_defaults_for_secondary_limits():
+    default = github_metrics.SECONDARY_RATE_LIMIT_WAIT
+    assert github_metrics.get_rate_limit_wait(FakeResponse(429)) == default
+    assert github_metrics.get_rate_limit_wait(FakeResponse(403, text="You have exceeded a secondary rate limit")) == default
+
+
+def test_send_request_retries_rate_limited_responses(monkeypatch, sleeps):
+    session = FakeSession([FakeResponse(429, {"Retry-After": "2"}), FakeResponse(403, {"Retry-After": "5"}), FakeResponse(200)])
+    monkeypatch.setattr(github_metrics, "_SESSION", session)
+
+    response = github_metrics.send_request("GET", "https://api.github.com/x")
+
+    assert response.status_code == 200
+    assert session.calls == 3
+    assert sleeps == [2, 5]
+
+
+def test_send_request_gives_up_after_retries(monkeypatch, sleeps):
+    attempts = github_metrics.RATE_LIMIT_RETRIES
+    session = FakeSession([FakeResponse(429, {"Retry-After": "1"}) for _ in range(attempts)])
+    monkeypatch.setattr(github_metrics, "_SESSION", session)
+
+    response = github_metrics.send_request("GET", "https://api.github.com/x")
+
+    assert response.status_code == 429
+    assert session.calls == attempts
+    assert sleeps == [1] * (attempts - 1)
+
+
+def test_send_request_waits_for_reset_when_budget_is_exhausted(monkeypatch, sleeps):
+    monkeypatch.setattr(github_metrics.time, "time", lambda: 1000)
+    session = FakeSession([FakeResponse(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1060"})])
+    monkeypatch.setattr(github_metrics, "_SESSION", session)
+
+    response = github_metrics.send_request("GET", "https://api.github.com/x")
+
+    assert response.status_code == 200
+    assert sleeps == [60]